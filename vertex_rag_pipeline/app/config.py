@@ -29,12 +29,48 @@ GCS_STAGING_BUCKET_NAME = os.getenv("GCS_STAGING_BUCKET_NAME")
 ALLOWED_SUFFIXES = [".pdf", ".txt", ".md"]
 # Whether to search subdirectories recursively
 RECURSIVE_LOAD = True
+# Number of worker processes used to load documents in parallel.
+# Defaults to cpu_count - 1 so the parent process keeps a core for itself.
+# Clamped to at least 1 so a zero/negative override can't break Pool creation.
+LOAD_DOCUMENTS_NUMBER_OF_THREADS = max(
+    1, int(os.getenv("LOAD_DOCUMENTS_NUMBER_OF_THREADS", (os.cpu_count() or 2) - 1))
+)
 
 # --- Text Processing Settings ---
-# Target number of characters per document chunk
+# Target number of tokens per document chunk. Embedding models measure
+# input in tokens, so token-based sizing avoids both oversize chunks
+# (truncated by the model) and undersize chunks (wasted embedding RPCs).
+CHUNK_SIZE_TOKENS = int(os.getenv("CHUNK_SIZE_TOKENS", 512))
+# Number of tokens to overlap between consecutive chunks
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", 50))
+# tiktoken encoding used to count tokens during splitting
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "cl100k_base")
+# Character-based fallback settings, used only if tiktoken is unavailable
 CHUNK_SIZE = 1000
 # Number of characters to overlap between consecutive chunks
 CHUNK_OVERLAP = 100
+# Number of worker processes used to split documents in parallel (min 1)
+SPLIT_DOCUMENTS_NUMBER_OF_PROCESSES = max(
+    1, int(os.getenv("SPLIT_DOCUMENTS_NUMBER_OF_PROCESSES", os.cpu_count() or 1))
+)
+
+# --- Vector Store Upsert Settings ---
+# Number of texts sent per embed_documents request. The Vertex Embeddings
+# API batches natively up to a model-specific limit (typically 250 texts).
+VERTEX_EMBED_BATCH_SIZE = int(os.getenv("VERTEX_EMBED_BATCH_SIZE", 250))
+# Local SQLite cache recording content hashes of chunks already upserted,
+# so incremental re-runs skip re-embedding and re-staging identical chunks.
+# expanduser covers overrides written with a leading ~, as in .env.example.
+VERTEX_UPSERT_CACHE_PATH = os.path.expanduser(
+    os.getenv(
+        "VERTEX_UPSERT_CACHE_PATH",
+        os.path.join("~", ".cache", "vertex_rag", "upserted.sqlite"),
+    )
+)
+# Number of add_documents batches kept in flight concurrently. The hot path
+# is network-bound (Vertex AI embedding RPCs + GCS staging uploads), so
+# threads are appropriate here; raise with care around Vertex quotas (min 1).
+VERTEX_UPSERT_CONCURRENCY = max(1, int(os.getenv("VERTEX_UPSERT_CONCURRENCY", 8)))
 
 # --- Query Settings ---
 # Default number of results to retrieve during similarity search
@@ -59,9 +95,9 @@ def validate_config():
         logger.error(f"Missing required configuration variables: {', '.join(missing_vars)}")
         raise ValueError(f"Missing required configuration variables: {', '.join(missing_vars)}. Please check your .env file or environment.")
 
-    if not GCS_STAGING_BUCKET_NAME.startswith('gs://'):
-         logger.warning(f"GCS_STAGING_BUCKET_NAME ('{GCS_STAGING_BUCKET_NAME}') does not start with 'gs://'. The Vertex AI client expects the 'gs://' prefix.")
-         # Note: The client library might handle this, but explicit check is good.
+    if GCS_STAGING_BUCKET_NAME.startswith('gs://'):
+         logger.warning(f"GCS_STAGING_BUCKET_NAME ('{GCS_STAGING_BUCKET_NAME}') starts with 'gs://'. The vector store expects the bare bucket name; the prefix is stripped automatically.")
+         # Note: gcp_clients strips the prefix before building the store, but explicit check is good.
 
     logger.info("Configuration loaded and validated (basic checks).")
 
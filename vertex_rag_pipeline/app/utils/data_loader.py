@@ -1,13 +1,10 @@
+import functools
+import itertools
 import logging
+import multiprocessing
+from collections import defaultdict
 from pathlib import Path
-from typing import List, Dict, Type, Optional
-from langchain_community.document_loaders import (
-    DirectoryLoader,
-    PyMuPDFLoader, # Preferred PDF loader
-    TextLoader,
-    UnstructuredMarkdownLoader,
-    BaseLoader, # For type hinting
-)
+from typing import Callable, List, Dict, FrozenSet, Type, Optional, TYPE_CHECKING
 from langchain_core.documents import Document
 import sys
 import os
@@ -16,46 +13,176 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
 
+if TYPE_CHECKING:
+    from langchain_core.document_loaders import BaseLoader # For type hinting only
+
+try:
+    from tqdm import tqdm
+except ImportError: # Progress bars are a nicety, not a requirement
+    tqdm = None
+
 logger = logging.getLogger(__name__)
 
-# Mapping of file suffixes to LangChain Loader classes
+# Loader classes are resolved lazily, per suffix: importing PyMuPDF or the
+# unstructured dependency tree costs hundreds of ms of startup, which is
+# pure waste for .txt-only ingests (and for queries, which never load files).
+# Each factory imports its loader's dependencies only when a matching file
+# actually exists in the corpus.
+def _pdf_loader() -> Type["BaseLoader"]:
+    from utils.pdf_loader import ParallelPyMuPDFLoader # Pulls in pymupdf
+    return ParallelPyMuPDFLoader
+
+def _text_loader() -> Type["BaseLoader"]:
+    from langchain_community.document_loaders import TextLoader
+    return TextLoader
+
+def _markdown_loader() -> Type["BaseLoader"]:
+    from langchain_community.document_loaders import UnstructuredMarkdownLoader # Pulls in unstructured
+    return UnstructuredMarkdownLoader
+
+# Mapping of file suffixes to loader-class factories
 # Ensure required libraries (e.g., pymupdf, unstructured) are installed
-DEFAULT_LOADER_MAP: Dict[str, Type[BaseLoader]] = {
-    ".pdf": PyMuPDFLoader,
-    ".txt": TextLoader,
-    ".md": UnstructuredMarkdownLoader,
-    # Add more mappings here as needed, e.g.:
-    # ".csv": CSVLoader,
-    # ".docx": UnstructuredWordDocumentLoader,
-    # ".html": UnstructuredHTMLLoader,
+_LOADER_FACTORIES: Dict[str, Callable[[], Type["BaseLoader"]]] = {
+    ".pdf": _pdf_loader,
+    ".txt": _text_loader,
+    ".md": _markdown_loader,
+    # Add more factories here as needed, e.g.:
+    # ".csv": lambda: CSVLoader,
+    # ".docx": lambda: UnstructuredWordDocumentLoader,
+    # ".html": lambda: UnstructuredHTMLLoader,
 }
 
-def load_documents(
-    source_dir: str,
-    allowed_suffixes: Optional[List[str]] = None,
-    loader_map: Optional[Dict[str, Type[BaseLoader]]] = None,
-    recursive: bool = config.RECURSIVE_LOAD
-) -> List[Document]:
+@functools.lru_cache(maxsize=None)
+def _resolve_loader(suffix: str) -> Optional[Type["BaseLoader"]]:
+    """Resolves (and caches) the loader class for a suffix, importing it on first use."""
+    factory = _LOADER_FACTORIES.get(suffix)
+    return factory() if factory is not None else None
+
+def _walk(root: Path, suffixes: FrozenSet[str], recursive: bool = True) -> Dict[str, List[str]]:
     """
-    Loads documents from the specified directory using configured loaders,
-    filtering by allowed suffixes.
+    Walks a directory in a single pass, bucketing file paths by lowercase
+    suffix. One traversal serves every suffix and both the shallow and
+    recursive modes — no per-suffix glob patterns or repeated tree walks.
+
+    Uses os.scandir with an explicit stack rather than pathlib globbing:
+    DirEntry caches the file-type information returned by the underlying
+    getdents64 call, so is_file()/is_dir() avoid the extra stat() syscall
+    per entry that rglob incurs. Symlinks are never followed, which also
+    guards against cycle-induced re-walks.
 
     Args:
-        source_dir: The path to the directory containing documents.
-        allowed_suffixes: List of file extensions to load (e.g., ['.pdf']).
-                          Defaults to config.ALLOWED_SUFFIXES.
-        loader_map: Dictionary mapping extensions to loader classes.
-                    Defaults to DEFAULT_LOADER_MAP.
-        recursive: Whether to search subdirectories. Defaults to config.RECURSIVE_LOAD.
+        root: Directory to walk.
+        suffixes: Lowercase suffixes to keep (e.g. frozenset({'.pdf', '.txt'})).
+        recursive: Whether to descend into subdirectories.
 
+    Returns:
+        Mapping of suffix -> list of matching file paths (as strings).
+    """
+    buckets: Dict[str, List[str]] = defaultdict(list)
+    stack = [str(root)]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        suffix = os.path.splitext(entry.name)[1].lower()
+                        if suffix in suffixes:
+                            buckets[suffix].append(entry.path)
+        except OSError as e:
+            # Unreadable subdirectory: log and keep walking the rest of the tree.
+            logger.warning(f"Could not scan directory {current}: {e}")
+    return buckets
+
+@functools.lru_cache(maxsize=8)
+def _walk_cached(root: str, root_mtime_ns: int, suffixes: FrozenSet[str], recursive: bool) -> Dict[str, List[str]]:
+    """
+    Memoized front-end for the directory walk, so ingesting the same
+    directory twice in one process (e.g. repeated pipeline runs from a
+    REPL) doesn't redo the traversal syscalls.
+
+    root_mtime_ns participates only in the cache key: when the root
+    directory's mtime changes (entries added/removed), the stale entry
+    stops matching and a fresh walk happens. Changes deeper in the tree
+    that don't touch the root mtime are not detected — acceptable for the
+    CLI's walk-then-ingest usage. Callers must treat the returned buckets
+    as read-only since the cached object is shared.
+    """
+    return _walk(Path(root), suffixes, recursive)
+
+def _load_single(path: str, loader_map: Optional[Dict[str, Type["BaseLoader"]]] = None) -> List[Document]:
+    """
+    Loads a single file using the loader registered for its suffix.
+
+    Module-level so it can be pickled and dispatched to multiprocessing
+    workers. Errors are logged and swallowed (returning an empty list) to
+    mirror the silent_errors=True behaviour of the old DirectoryLoader path.
+
+    Args:
+        path: Path to the file to load.
+        loader_map: Suffix -> loader class mapping. Defaults to the lazy
+                    built-in factories (_LOADER_FACTORIES).
 
     Returns:
-        A list of loaded LangChain Document objects.
+        The list of Documents loaded from the file, or an empty list on error.
+    """
+    suffix = Path(path).suffix.lower()
+    try:
+        loader_cls = loader_map.get(suffix) if loader_map is not None else _resolve_loader(suffix)
+    except ImportError as e:
+        logger.error(f"Missing dependency for loader handling '{suffix}' files: {e}. Please install it. Skipping {path}.")
+        return []
+    if loader_cls is None:
+        logger.warning(f"No loader configured for suffix '{suffix}'. Skipping {path}.")
+        return []
+    try:
+        return loader_cls(path).load()
+    except Exception as e:
+        # Keep going on individual file failures; the parent logs aggregate counts.
+        logger.error(f"Failed to load {path} with {loader_cls.__name__}: {e}")
+        return []
+
+def _load_and_split(path: str, loader_map: Optional[Dict[str, Type["BaseLoader"]]] = None) -> List[Document]:
+    """
+    Loads a single file and immediately splits it into chunks, returning
+    only the chunks.
+
+    Running the splitter inside the loader worker means full documents
+    never cross the worker -> parent process boundary: only the (smaller)
+    chunks are pickled back, and the raw document text is freed as soon as
+    each file is done.
+    """
+    from utils.text_processing import _split_chunk # Deferred: keeps worker imports light for loading-only runs
+
+    docs = _load_single(path, loader_map)
+    if not docs:
+        return []
+    try:
+        return _split_chunk(docs)
+    except Exception as e:
+        logger.error(f"Failed to split documents loaded from {path}: {e}")
+        return []
+
+def _map_files_with_pool(
+    source_dir: str,
+    allowed_suffixes: Optional[List[str]],
+    loader_map: Optional[Dict[str, Type["BaseLoader"]]],
+    recursive: bool,
+    worker_fn: Callable[..., List[Document]],
+) -> List[Document]:
+    """
+    Shared driver for the parallel load paths: walks the source directory
+    once, streams the matching files through a multiprocessing Pool running
+    worker_fn, and folds the per-file results into one list.
     """
     if allowed_suffixes is None:
         allowed_suffixes = config.ALLOWED_SUFFIXES
-    if loader_map is None:
-        loader_map = DEFAULT_LOADER_MAP
+    # Suffixes a loader exists for; actual classes are resolved lazily in
+    # the workers so loader dependencies are only imported when needed.
+    registered_suffixes = frozenset(loader_map) if loader_map is not None else frozenset(_LOADER_FACTORIES)
 
     source_path = Path(source_dir)
     if not source_path.is_dir():
@@ -66,69 +193,119 @@ def load_documents(
     logger.info(f"Allowed file suffixes: {allowed_suffixes}")
     logger.info(f"Recursive loading: {recursive}")
 
-    loaded_docs: List[Document] = []
-    loaders_used = set()
-    files_processed = 0
-    files_failed = 0
-
-    # Use DirectoryLoader for each supported suffix type
-    for suffix in allowed_suffixes:
-        specific_loader = loader_map.get(suffix.lower()) # Use lower case for matching
-        if not specific_loader:
+    # Normalise suffixes once; matching is case-insensitive. Only walk for
+    # suffixes that actually have a loader registered.
+    suffixes = frozenset(s.lower() for s in allowed_suffixes)
+    for suffix in sorted(suffixes):
+        if suffix not in registered_suffixes:
             logger.warning(f"No specific loader configured for suffix '{suffix}'. Skipping files with this extension.")
-            continue
+    loadable_suffixes = suffixes & registered_suffixes
 
-        glob_pattern = f"**/*{suffix}" if recursive else f"*{suffix}"
-        try:
-            # Note: silent_errors=True in DirectoryLoader logs errors but returns successfully loaded docs.
-            # Individual file loading errors are handled within the loader itself.
-            loader = DirectoryLoader(
-                str(source_path), # DirectoryLoader expects string path
-                glob=glob_pattern,
-                loader_cls=specific_loader,
-                recursive=recursive, # Already handled by glob pattern? Redundant but safe.
-                show_progress=True, # Show a progress bar during loading
-                use_multithreading=True, # Attempt to speed up loading
-                silent_errors=True, # Log file loading errors and continue
-                # loader_kwargs can be passed here if needed, e.g., {'encoding': 'utf-8'} for TextLoader
-            )
-
-            docs_for_suffix = loader.load() # This performs the actual loading
-
-            if docs_for_suffix:
-                loaded_docs.extend(docs_for_suffix)
-                loaders_used.add(specific_loader.__name__)
-                logger.info(f"Loaded {len(docs_for_suffix)} documents with suffix '{suffix}' using {specific_loader.__name__}.")
-                # We don't easily know how many failed from DirectoryLoader with silent_errors=True
-                # To get precise counts, one might need to glob manually and load file-by-file.
-            else:
-                 logger.info(f"No documents found or loaded for suffix '{suffix}' in {source_dir} (check glob pattern and file contents).")
-
-            # Estimate processed files (less accurate with silent_errors)
-            # files_processed += len(list(source_path.rglob(f"*{suffix}"))) if recursive else len(list(source_path.glob(f"*{suffix}")))
-
-
-        except ImportError as e:
-             logger.error(f"Missing dependency for loader {specific_loader.__name__} required for '{suffix}' files: {e}. Please install it.")
-             files_failed += len(list(source_path.rglob(f"*{suffix}"))) if recursive else len(list(source_path.glob(f"*{suffix}"))) # Estimate failures
-        except Exception as e:
-            # Catch potential errors during DirectoryLoader initialization or broad loading issues
-            logger.exception(f"Error loading files with suffix '{suffix}' from {source_dir}: {e}")
-            # Count potential failures if error is broad
-            files_failed += len(list(source_path.rglob(f"*{suffix}"))) if recursive else len(list(source_path.glob(f"*{suffix}")))
-
-    # A more accurate way to count processed/failed would involve globbing first
-    all_files = list(source_path.rglob("*")) if recursive else list(source_path.glob("*"))
-    files_processed = len([f for f in all_files if f.is_file() and f.suffix.lower() in allowed_suffixes])
+    # Single-pass walk bucketing candidate files by suffix for the Pool,
+    # memoized so re-ingesting the same unchanged directory skips the I/O.
+    buckets = _walk_cached(
+        str(source_path.resolve()), source_path.stat().st_mtime_ns, loadable_suffixes, recursive
+    )
+
+    # Stream the bucketed paths into the Pool rather than materialising a
+    # combined list; counters come from the walk, not from extra traversals.
+    files_processed = sum(len(paths) for paths in buckets.values())
+    file_iter = itertools.chain.from_iterable(buckets[suffix] for suffix in sorted(buckets))
+
+    if not files_processed:
+        logger.warning(f"No matching files found in {source_dir} for suffixes {sorted(suffixes)}.")
+        return []
+
+    loaded_docs: List[Document] = []
+    files_failed = 0
+    num_workers = min(config.LOAD_DOCUMENTS_NUMBER_OF_THREADS, files_processed)
+    logger.info(f"Loading {files_processed} files across {num_workers} worker processes...")
 
+    # One bar in the parent, ticked as workers hand results back. The old
+    # DirectoryLoader drew a tqdm bar per suffix inside each thread, which
+    # serialized on the tqdm lock and collides entirely under multiprocessing.
+    pbar = tqdm(total=files_processed, desc="Loading documents", unit="file") if tqdm is not None else None
+    try:
+        load_fn = functools.partial(worker_fn, loader_map=loader_map)
+        with multiprocessing.Pool(processes=num_workers) as pool:
+            for docs_for_file in pool.imap_unordered(load_fn, file_iter, chunksize=16):
+                if docs_for_file:
+                    loaded_docs.extend(docs_for_file)
+                else:
+                    files_failed += 1
+                if pbar is not None:
+                    pbar.update(1)
+    except Exception as e:
+        # Pool-level failures (e.g. a worker dying) are not per-file errors; surface them.
+        logger.exception(f"Error while loading documents from {source_dir}: {e}")
+        raise RuntimeError(f"Document loading failed for {source_dir}. Error: {e}") from e
+    finally:
+        if pbar is not None:
+            pbar.close()
 
     if not loaded_docs:
         logger.warning(f"No documents were successfully loaded from {source_dir} with the specified criteria.")
     else:
-        # Imperfect failure count due to silent_errors=True
-        # files_failed = files_processed - len(loaded_docs) # This isn't quite right if one doc fails loading
-        logger.info(f"Finished loading. Total documents successfully loaded: {len(loaded_docs)} / ~{files_processed} potential files.")
-        # logger.info(f"Estimated files failed or skipped: {files_failed}") # Less reliable count
-        logger.info(f"Loaders used: {', '.join(loaders_used)}")
+        logger.info(f"Finished loading. Total documents successfully loaded: {len(loaded_docs)} from {files_processed} files.")
+        if files_failed:
+            logger.warning(f"{files_failed} files yielded no documents (failed to load or empty).")
 
-    return loaded_docs
\ No newline at end of file
+    return loaded_docs
+
+def load_documents(
+    source_dir: str,
+    allowed_suffixes: Optional[List[str]] = None,
+    loader_map: Optional[Dict[str, Type["BaseLoader"]]] = None,
+    recursive: bool = config.RECURSIVE_LOAD
+) -> List[Document]:
+    """
+    Loads documents from the specified directory using configured loaders,
+    filtering by allowed suffixes.
+
+    Files are loaded in parallel across a multiprocessing Pool. PDF and
+    markdown parsing are CPU-bound pure-Python work, so threads (the old
+    DirectoryLoader use_multithreading=True path) serialized on the GIL;
+    separate processes give true parallelism across cores.
+
+    Args:
+        source_dir: The path to the directory containing documents.
+        allowed_suffixes: List of file extensions to load (e.g., ['.pdf']).
+                          Defaults to config.ALLOWED_SUFFIXES.
+        loader_map: Dictionary mapping extensions to loader classes.
+                    Defaults to the built-in lazy loader factories.
+        recursive: Whether to search subdirectories. Defaults to config.RECURSIVE_LOAD.
+
+
+    Returns:
+        A list of loaded LangChain Document objects.
+    """
+    return _map_files_with_pool(source_dir, allowed_suffixes, loader_map, recursive, _load_single)
+
+def load_and_split_documents(
+    source_dir: str,
+    allowed_suffixes: Optional[List[str]] = None,
+    loader_map: Optional[Dict[str, Type["BaseLoader"]]] = None,
+    recursive: bool = config.RECURSIVE_LOAD
+) -> List[Document]:
+    """
+    Loads documents and splits them into chunks in one fused pass.
+
+    Each worker process splits the files it loaded before returning, so
+    only chunks are pickled back to the parent and the full document list
+    never exists in memory — peak usage is roughly the chunk list alone,
+    instead of raw documents plus chunks when load_documents and
+    split_documents run as separate stages. Callers using this function
+    should not pass the result through split_documents again.
+
+    Args:
+        source_dir: The path to the directory containing documents.
+        allowed_suffixes: List of file extensions to load (e.g., ['.pdf']).
+                          Defaults to config.ALLOWED_SUFFIXES.
+        loader_map: Dictionary mapping extensions to loader classes.
+                    Defaults to the built-in lazy loader factories.
+        recursive: Whether to search subdirectories. Defaults to config.RECURSIVE_LOAD.
+
+    Returns:
+        A list of Document chunks ready for embedding.
+    """
+    return _map_files_with_pool(source_dir, allowed_suffixes, loader_map, recursive, _load_and_split)
@@ -1,7 +1,8 @@
 import logging
 from typing import Optional
 from google.api_core.exceptions import GoogleAPIError, NotFound
-from langchain_google_vertexai import VertexAIEmbeddings, VertexAIVectorSearch
+from langchain_google_vertexai import VertexAIEmbeddings
+from langchain_google_vertexai.vectorstores import VectorSearchVectorStore
 import sys
 import os
 
@@ -13,12 +14,20 @@ logger = logging.getLogger(__name__)
 
 # Simple in-memory cache for clients
 _vertex_embeddings_client: Optional[VertexAIEmbeddings] = None
-_vertex_vector_search_client: Optional[VertexAIVectorSearch] = None
+_vertex_vector_search_client: Optional[VectorSearchVectorStore] = None
 
-def get_vertex_embeddings_client() -> VertexAIEmbeddings:
+def get_vertex_embeddings_client(healthcheck: bool = False) -> VertexAIEmbeddings:
     """
     Initializes and returns a cached Vertex AI Embeddings client.
     Relies on Application Default Credentials (ADC).
+
+    Args:
+        healthcheck: If True, issue a small test embedding on first
+                     initialization to verify connectivity/authentication
+                     early. Off by default: the extra RPC is a cold-start
+                     tax (~100-500ms) paid by every process that touches
+                     the client, including short-lived CLI queries and
+                     multiprocessing workers that may never embed.
     """
     global _vertex_embeddings_client
     if _vertex_embeddings_client is None:
@@ -32,9 +41,12 @@ def get_vertex_embeddings_client() -> VertexAIEmbeddings:
                 model_name=config.VERTEX_EMBEDDING_MODEL,
                 # credentials=None # Explicitly rely on ADC
             )
-            # Perform a small test embedding to check connectivity/authentication early
-            _vertex_embeddings_client.embed_query("test")
-            logger.info("VertexAIEmbeddings client initialized and tested successfully.")
+            if healthcheck:
+                # Perform a small test embedding to check connectivity/authentication early
+                _vertex_embeddings_client.embed_query("test")
+                logger.info("VertexAIEmbeddings client initialized and tested successfully.")
+            else:
+                logger.info("VertexAIEmbeddings client initialized (healthcheck skipped; first real embedding call will validate connectivity).")
         except GoogleAPIError as e:
             logger.exception(f"Failed to initialize VertexAIEmbeddings client due to Google API error: {e}")
             raise RuntimeError("Could not connect to Vertex AI Embeddings API. Check credentials (ADC), permissions, and API enablement.") from e
@@ -43,7 +55,7 @@ def get_vertex_embeddings_client() -> VertexAIEmbeddings:
              raise RuntimeError("Unexpected error initializing Vertex AI Embeddings.") from e
     return _vertex_embeddings_client
 
-def get_vertex_vector_search_client() -> VertexAIVectorSearch:
+def get_vertex_vector_search_client() -> VectorSearchVectorStore:
     """
     Initializes and returns a cached Vertex AI Vector Search client.
     Requires a valid embeddings client. Relies on ADC.
@@ -56,36 +68,36 @@ def get_vertex_vector_search_client() -> VertexAIVectorSearch:
         # Ensure embeddings client is initialized first
         embeddings_client = get_vertex_embeddings_client() # Can raise error if fails
 
-        # Ensure staging bucket name includes gs:// prefix if not already present
+        # from_components expects the bare bucket name (it looks the bucket up
+        # via the GCS client); strip a gs:// prefix if one was configured.
         staging_bucket = config.GCS_STAGING_BUCKET_NAME
-        if not staging_bucket.startswith("gs://"):
-            staging_bucket = f"gs://{staging_bucket}"
-            logger.warning(f"Prepended 'gs://' to GCS_STAGING_BUCKET_NAME. Using: {staging_bucket}")
-
+        if staging_bucket.startswith("gs://"):
+            staging_bucket = staging_bucket[len("gs://"):]
+            logger.warning(f"Stripped 'gs://' from GCS_STAGING_BUCKET_NAME. Using bucket name: {staging_bucket}")
 
         try:
-            logger.info(f"Initializing VertexAIVectorSearch (Project: {config.GCP_PROJECT_ID}, Region: {config.GCP_REGION}, Index: {config.VECTOR_SEARCH_INDEX_ID}, Endpoint: {config.VECTOR_SEARCH_INDEX_ENDPOINT_ID}, Staging Bucket: {staging_bucket})")
-            _vertex_vector_search_client = VertexAIVectorSearch(
+            logger.info(f"Initializing VectorSearchVectorStore (Project: {config.GCP_PROJECT_ID}, Region: {config.GCP_REGION}, Index: {config.VECTOR_SEARCH_INDEX_ID}, Endpoint: {config.VECTOR_SEARCH_INDEX_ENDPOINT_ID}, Staging Bucket: {staging_bucket})")
+            _vertex_vector_search_client = VectorSearchVectorStore.from_components(
                 project_id=config.GCP_PROJECT_ID,
-                location=config.GCP_REGION,
+                region=config.GCP_REGION,
+                gcs_bucket_name=staging_bucket, # Staging bucket for index updates
                 index_id=config.VECTOR_SEARCH_INDEX_ID,
                 endpoint_id=config.VECTOR_SEARCH_INDEX_ENDPOINT_ID, # Endpoint ID for the index
                 embedding=embeddings_client, # Pass the initialized embedding client
-                # credentials=None, # Explicitly rely on ADC
-                staging_bucket=staging_bucket,
+                # credentials_path=None, # Explicitly rely on ADC
             )
             # Test connection by trying to fetch index details (optional check)
             # Note: The LangChain wrapper doesn't directly expose index/endpoint get methods easily.
             # A low-level client check could be added if needed, but relying on first operation is often sufficient.
-            logger.info("VertexAIVectorSearch client initialized successfully.")
+            logger.info("VectorSearchVectorStore client initialized successfully.")
         except NotFound as e:
-            logger.exception(f"Failed to initialize VertexAIVectorSearch: Resource not found (Index or Endpoint?). Check IDs: {e}")
+            logger.exception(f"Failed to initialize VectorSearchVectorStore: Resource not found (Index or Endpoint?). Check IDs: {e}")
             raise RuntimeError(f"Vertex AI Vector Search resource not found. Check Index ID '{config.VECTOR_SEARCH_INDEX_ID}' and Endpoint ID '{config.VECTOR_SEARCH_INDEX_ENDPOINT_ID}'.") from e
         except GoogleAPIError as e:
-            logger.exception(f"Failed to initialize VertexAIVectorSearch client due to Google API error: {e}")
+            logger.exception(f"Failed to initialize VectorSearchVectorStore client due to Google API error: {e}")
             raise RuntimeError("Could not connect to Vertex AI Vector Search API. Check credentials (ADC), permissions, API enablement, and resource IDs.") from e
         except Exception as e:
-             logger.exception(f"An unexpected error occurred during VertexAIVectorSearch initialization: {e}")
+             logger.exception(f"An unexpected error occurred during VectorSearchVectorStore initialization: {e}")
              raise RuntimeError("Unexpected error initializing Vertex AI Vector Search.") from e
     return _vertex_vector_search_client
 
@@ -94,4 +106,12 @@ def reset_clients():
     global _vertex_embeddings_client, _vertex_vector_search_client
     _vertex_embeddings_client = None
     _vertex_vector_search_client = None
-    logger.debug("GCP clients cache reset.")
\ No newline at end of file
+    logger.debug("GCP clients cache reset.")
+
+# The loading/splitting pools fork worker processes. A forked child would
+# inherit the module-level client singletons — and with them live HTTP/gRPC
+# sessions whose sockets are shared with the parent, which corrupts silently
+# under concurrent use. Clear the cache in every child so workers that do
+# need a client lazily build their own fresh one.
+if hasattr(os, "register_at_fork"): # Not available on Windows
+    os.register_at_fork(after_in_child=reset_clients)
\ No newline at end of file
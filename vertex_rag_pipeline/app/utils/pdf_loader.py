@@ -0,0 +1,65 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import fitz  # PyMuPDF
+from langchain_core.document_loaders import BaseLoader
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+class ParallelPyMuPDFLoader(BaseLoader):
+    """
+    PDF loader that extracts pages concurrently with PyMuPDF.
+
+    PyMuPDFLoader processes a whole PDF serially, so a few very large PDFs
+    dominate load time even when files are loaded in parallel. This loader
+    opens the document once and extracts page text across a small thread
+    pool — PyMuPDF releases the GIL during text extraction, so threads give
+    real overlap without the cost of shipping the document to another
+    process. Produces one Document per page, like PyMuPDFLoader.
+    """
+
+    def __init__(self, file_path: str, max_workers: int = 4):
+        """
+        Args:
+            file_path: Path to the PDF file.
+            max_workers: Maximum number of threads extracting pages concurrently.
+        """
+        self.file_path = file_path
+        self.max_workers = max_workers
+
+    def load(self) -> List[Document]:
+        """Loads the PDF and returns one Document per page."""
+        pdf = fitz.open(self.file_path)
+        try:
+            page_count = pdf.page_count
+            if page_count == 0:
+                logger.warning(f"PDF has no pages: {self.file_path}")
+                return []
+
+            workers = min(self.max_workers, page_count)
+            if workers > 1:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    texts = list(executor.map(lambda i: pdf[i].get_text("text"), range(page_count)))
+            else:
+                texts = [pdf[i].get_text("text") for i in range(page_count)]
+
+            # Keep the same per-page metadata shape PyMuPDFLoader emits so
+            # downstream consumers (chunk metadata, cache keys) are unaffected.
+            file_metadata = {k: v for k, v in (pdf.metadata or {}).items() if v}
+            return [
+                Document(
+                    page_content=texts[page],
+                    metadata={
+                        "source": self.file_path,
+                        "file_path": self.file_path,
+                        "page": page,
+                        "total_pages": page_count,
+                        **file_metadata,
+                    },
+                )
+                for page in range(page_count)
+            ]
+        finally:
+            pdf.close()
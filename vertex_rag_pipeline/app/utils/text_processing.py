@@ -1,4 +1,6 @@
+import itertools
 import logging
+import multiprocessing
 from typing import List
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
@@ -11,10 +13,52 @@ import config
 
 logger = logging.getLogger(__name__)
 
+def _build_splitter() -> RecursiveCharacterTextSplitter:
+    """
+    Constructs the text splitter from the configured chunking settings.
+
+    Prefers token-based sizing via tiktoken: embedding models measure input
+    in tokens, so counting characters (length_function=len) produced chunks
+    that were either truncated by the model or too small to be worth an
+    embedding RPC. Falls back to character counting if tiktoken is missing.
+    """
+    try:
+        return RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+            encoding_name=config.TOKENIZER_ENCODING,
+            chunk_size=config.CHUNK_SIZE_TOKENS,
+            chunk_overlap=config.CHUNK_OVERLAP_TOKENS,
+            is_separator_regex=False,    # Treat separators as literal strings
+            add_start_index=True,        # Add metadata indicating chunk's start position in original doc
+        )
+    except ImportError:
+        logger.warning("tiktoken is not installed; falling back to character-based chunk sizing.")
+        return RecursiveCharacterTextSplitter(
+            chunk_size=config.CHUNK_SIZE,
+            chunk_overlap=config.CHUNK_OVERLAP,
+            length_function=len,         # Function to measure chunk size (standard character length)
+            is_separator_regex=False,    # Treat separators as literal strings
+            add_start_index=True,        # Add metadata indicating chunk's start position in original doc
+        )
+
+def _split_chunk(docs: List[Document]) -> List[Document]:
+    """
+    Splits one slice of the document list.
+
+    Module-level so multiprocessing workers can pickle and run it. Each
+    worker builds its own splitter; construction is cheap relative to the
+    splitting work itself.
+    """
+    return _build_splitter().split_documents(docs)
+
 def split_documents(documents: List[Document]) -> List[Document]:
     """
     Splits loaded documents into smaller chunks using RecursiveCharacterTextSplitter.
 
+    Splitting is pure-Python CPU work (string scans and recursion over
+    separators) with no I/O, so the document list is sharded across a
+    multiprocessing Pool rather than split in a single GIL-bound thread.
+    Small inputs are split serially to avoid paying the Pool start-up cost.
+
     Args:
         documents: A list of LangChain Document objects loaded by the data loader.
 
@@ -26,21 +70,23 @@ def split_documents(documents: List[Document]) -> List[Document]:
         return []
 
     logger.info(f"Starting text splitting for {len(documents)} documents...")
-    logger.info(f"Using RecursiveCharacterTextSplitter with chunk_size={config.CHUNK_SIZE}, chunk_overlap={config.CHUNK_OVERLAP}")
-
-    # Initialize the text splitter
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=config.CHUNK_SIZE,
-        chunk_overlap=config.CHUNK_OVERLAP,
-        length_function=len,         # Function to measure chunk size (standard character length)
-        is_separator_regex=False,    # Treat separators as literal strings
-        add_start_index=True,        # Add metadata indicating chunk's start position in original doc
-    )
-
-    chunks = []
+    logger.info(f"Using RecursiveCharacterTextSplitter with chunk_size={config.CHUNK_SIZE_TOKENS} tokens, chunk_overlap={config.CHUNK_OVERLAP_TOKENS} tokens ({config.TOKENIZER_ENCODING})")
+
     doc_count = len(documents)
+    num_workers = min(config.SPLIT_DOCUMENTS_NUMBER_OF_PROCESSES, doc_count)
     try:
-        chunks = text_splitter.split_documents(documents) # This does the work
+        if num_workers <= 1 or doc_count < 2 * num_workers:
+            # Not enough work to amortise worker start-up; split in-process.
+            chunks = _split_chunk(documents)
+        else:
+            # Shard the input into roughly equal slices, one per worker.
+            slice_size = (doc_count + num_workers - 1) // num_workers
+            slices = [documents[i : i + slice_size] for i in range(0, doc_count, slice_size)]
+            logger.info(f"Splitting across {num_workers} worker processes ({len(slices)} slices)...")
+            with multiprocessing.Pool(processes=num_workers) as pool:
+                parts = pool.map(_split_chunk, slices)
+            chunks = list(itertools.chain.from_iterable(parts))
+
         logger.info(f"Successfully split {doc_count} documents into {len(chunks)} chunks.")
 
         if chunks:
@@ -56,4 +102,4 @@ def split_documents(documents: List[Document]) -> List[Document]:
         logger.exception(f"An error occurred during document splitting for {doc_count} documents.")
         # Decide on behavior: raise error, return partial results, return empty list?
         # Raising error is often safest for a batch process.
-        raise RuntimeError(f"Failed to split documents. Error: {e}") from e
\ No newline at end of file
+        raise RuntimeError(f"Failed to split documents. Error: {e}") from e
@@ -1,8 +1,13 @@
+import hashlib
 import logging
-from typing import List, Tuple
+import sqlite3
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional, Tuple
 from langchain_core.documents import Document
-from langchain_google_vertexai import VertexAIVectorSearch # The vector store class itself
+from langchain_google_vertexai.vectorstores import VectorSearchVectorStore # The vector store class itself
 from google.api_core.exceptions import GoogleAPIError, FailedPrecondition
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 import sys
 import os
 
@@ -12,42 +17,282 @@ import config
 
 logger = logging.getLogger(__name__)
 
-def add_documents_to_vector_store(vector_store: VertexAIVectorSearch, documents: List[Document], batch_size: int = 500):
+class _OrjsonShim:
+    """
+    stdlib-json-compatible facade over orjson, exposing just the dumps/loads
+    surface the LangChain staging writer uses. orjson returns bytes and
+    doesn't take stdlib keyword arguments, so a thin adapter is needed to
+    drop it in as a module-level `json` replacement.
+    """
+
+    @staticmethod
+    def dumps(obj, default=None, **kwargs) -> str:
+        import orjson
+        # OPT_SERIALIZE_NUMPY is defensive: the staging writer converts
+        # embedding rows to plain Python lists before serialising, so the
+        # option only matters if an ndarray ever reaches dumps directly.
+        return orjson.dumps(obj, default=default, option=orjson.OPT_SERIALIZE_NUMPY).decode("utf-8")
+
+    @staticmethod
+    def loads(data):
+        import orjson
+        return orjson.loads(data)
+
+def _use_orjson_for_staging() -> None:
+    """
+    Swaps stdlib json for orjson in the LangChain Vector Search staging
+    writers, which serialise every chunk record to GCS JSONL. orjson is
+    several times faster and allocates far less for these multi-MB
+    payloads. The staging json.dumps calls live in
+    langchain_google_vertexai.vectorstores._utils (record formatting) and
+    document_storage (GCS document store). Best-effort: if orjson is
+    missing or the library layout changed, stdlib json stays in place.
+    """
+    try:
+        import orjson # noqa: F401 - presence check only
+    except ImportError:
+        logger.debug("orjson not installed; Vector Search staging will use stdlib json.")
+        return
+
+    import importlib
+    patched = []
+    for module_name in (
+        "langchain_google_vertexai.vectorstores._utils",
+        "langchain_google_vertexai.vectorstores.document_storage",
+    ):
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        if hasattr(module, "json"):
+            module.json = _OrjsonShim
+            patched.append(module_name)
+    if patched:
+        logger.debug(f"Vector Search staging serialisation now uses orjson ({', '.join(patched)}).")
+    else:
+        logger.debug("No langchain_google_vertexai staging module with a json attribute found; leaving stdlib json in place.")
+
+_use_orjson_for_staging()
+
+def _document_cache_key(doc: Document) -> str:
+    """
+    Content hash identifying an upserted chunk: page content plus the
+    source path and start_index metadata that distinguish otherwise
+    identical text appearing in different places. The target project and
+    index IDs are mixed in as well, so the (shared) cache file never
+    treats a chunk as already indexed when the pipeline is pointed at a
+    different index or project.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(config.GCP_PROJECT_ID or "").encode("utf-8"))
+    h.update(str(config.VECTOR_SEARCH_INDEX_ID or "").encode("utf-8"))
+    h.update(doc.page_content.encode("utf-8"))
+    h.update(str(doc.metadata.get("source", "")).encode("utf-8"))
+    h.update(str(doc.metadata.get("start_index", "")).encode("utf-8"))
+    return h.hexdigest()
+
+def _open_upsert_cache() -> Optional[sqlite3.Connection]:
+    """
+    Opens (creating if needed) the local SQLite cache of upserted chunk
+    hashes. Returns None if the cache cannot be opened — caching is an
+    optimisation, never a reason to fail an ingest.
+    """
+    try:
+        os.makedirs(os.path.dirname(config.VERTEX_UPSERT_CACHE_PATH), exist_ok=True)
+        conn = sqlite3.connect(config.VERTEX_UPSERT_CACHE_PATH)
+        conn.execute("CREATE TABLE IF NOT EXISTS upserted (key TEXT PRIMARY KEY)")
+        conn.commit()
+        return conn
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"Could not open upsert cache at {config.VERTEX_UPSERT_CACHE_PATH}: {e}. Proceeding without cache.")
+        return None
+
+def _filter_cached_documents(
+    cache_conn: sqlite3.Connection, documents: List[Document]
+) -> Tuple[List[Document], List[str]]:
+    """
+    Drops documents whose content hash is already recorded in the cache.
+
+    Returns:
+        The documents still needing upsert and their cache keys (parallel lists).
+    """
+    keys = [_document_cache_key(doc) for doc in documents]
+    existing = set()
+    # Query in chunks to stay under SQLite's bound-variable limit.
+    for i in range(0, len(keys), 500):
+        chunk = keys[i : i + 500]
+        placeholders = ",".join("?" * len(chunk))
+        rows = cache_conn.execute(f"SELECT key FROM upserted WHERE key IN ({placeholders})", chunk)
+        existing.update(row[0] for row in rows)
+    if not existing:
+        return documents, keys
+    remaining = [(doc, key) for doc, key in zip(documents, keys) if key not in existing]
+    logger.info(f"Upsert cache hit for {len(documents) - len(remaining)}/{len(documents)} chunks; skipping already-indexed content.")
+    return [doc for doc, _ in remaining], [key for _, key in remaining]
+
+def _embed_texts_in_batches(embeddings_client, texts: List[str], max_workers: int) -> np.ndarray:
+    """
+    Embeds all texts via embed_documents, splitting into API-sized batches
+    and keeping several embedding RPCs in flight concurrently.
+
+    Results are stored as one contiguous float32 matrix rather than nested
+    Python float lists: a 768-dim vector of boxed floats costs ~28 bytes
+    per element versus 4 as float32, so this roughly halves embedding-side
+    RAM while the matrix is held. Each batch's boxed RPC response is
+    converted as it arrives, so only one batch of Python floats is ever
+    alive at a time. The saving is in-memory only — the staging writer
+    re-boxes each vector into a Python list when it builds the upsert
+    records, so serialisation cost is unchanged.
+
+    Args:
+        embeddings_client: The embeddings client backing the vector store.
+        texts: All chunk texts to embed.
+        max_workers: Upper bound on concurrent embedding requests.
+
+    Returns:
+        A (len(texts), dim) float32 array, rows in input order.
+    """
+    batch_size = config.VERTEX_EMBED_BATCH_SIZE
+    batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+    workers = min(max_workers, len(batches))
+    logger.info(f"Embedding {len(texts)} texts in {len(batches)} batches (up to {workers} concurrent requests)...")
+
+    parts: List[np.ndarray] = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(embeddings_client.embed_documents, batch) for batch in batches]
+        try:
+            # Collect in submission order so vectors line up with texts.
+            for future in futures:
+                parts.append(np.asarray(future.result(), dtype=np.float32))
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+    return np.concatenate(parts) if len(parts) > 1 else parts[0]
+
+def add_documents_to_vector_store(vector_store: VectorSearchVectorStore, documents: List[Document], batch_size: int = 500, use_cache: bool = True):
     """
     Adds document chunks to the configured Vertex AI Vector Search index.
 
     Handles batching and potential errors during the upsert process.
     The underlying LangChain implementation handles staging to GCS.
 
+    Embedding and upserting are split into two phases: all embeddings are
+    precomputed first through bulk embed_documents calls (batched to the
+    API's native limit and kept concurrent), then the precomputed vectors
+    are handed to add_texts_with_embeddings batch by batch. This avoids
+    serialising embed -> GCS staging -> upsert inside every add_documents
+    call and cuts the number of embedding round-trips. If the vector store
+    doesn't expose its embeddings client or the precomputed-vector entry
+    point, the previous concurrent add_documents path is used instead.
+    Concurrency is bounded by config.VERTEX_UPSERT_CONCURRENCY to stay
+    within Vertex quotas.
+
+    A local SQLite cache (config.VERTEX_UPSERT_CACHE_PATH) records the
+    content hash of every chunk successfully upserted, so incremental
+    re-runs skip re-embedding and re-staging identical chunks entirely.
+
     Args:
-        vector_store: An initialized VertexAIVectorSearch client instance.
+        vector_store: An initialized VectorSearchVectorStore client instance.
         documents: A list of LangChain Document objects (chunks) to add.
         batch_size: Number of documents to add in each batch call.
+        use_cache: Whether to consult/update the local upsert cache.
+                   Pass False to force re-indexing of all chunks.
     """
     if not documents:
         logger.warning("No documents provided to add to the vector store. Skipping.")
         return
 
+    cache_conn = _open_upsert_cache() if use_cache else None
+    cache_keys: List[str] = []
+    if cache_conn is not None:
+        documents, cache_keys = _filter_cached_documents(cache_conn, documents)
+        if not documents:
+            logger.info("All chunks are already recorded in the upsert cache; nothing to add.")
+            cache_conn.close()
+            return
+
     total_docs = len(documents)
     logger.info(f"Attempting to add {total_docs} document chunks to Vertex AI Vector Search index: {config.VECTOR_SEARCH_INDEX_ID}...")
 
+    embeddings_client = getattr(vector_store, "embeddings", None) or getattr(vector_store, "embedding", None)
+    use_precomputed = embeddings_client is not None and hasattr(vector_store, "add_texts_with_embeddings")
+    if not use_precomputed:
+        logger.warning("Vector store does not support precomputed embeddings; falling back to per-batch add_texts.")
+
+    # Pull the Document fields into parallel lists once (structure-of-arrays)
+    # instead of re-walking .page_content/.metadata per Document inside every
+    # batch; the batch loops below just slice these lists.
+    texts = [doc.page_content for doc in documents]
+    metadatas = [doc.metadata for doc in documents]
+
     added_count = 0
     try:
-        # Add documents in batches to avoid potential API limits or large requests
-        for i in range(0, total_docs, batch_size):
-            batch = documents[i : i + batch_size]
-            logger.info(f"Adding batch {i // batch_size + 1}/{(total_docs + batch_size - 1) // batch_size} ({len(batch)} documents)...")
+        if use_precomputed:
+            # Phase 1: embed everything up front in API-native batches.
+            vectors = _embed_texts_in_batches(embeddings_client, texts, config.VERTEX_UPSERT_CONCURRENCY)
 
-            # The add_documents method handles embedding and GCS staging internally.
-            # It returns the document IDs assigned by the vector store.
-            ids = vector_store.add_documents(batch) #, request_metadata=[("namespace", "your_rag_namespace")]) # Optional: Add metadata like namespace
-
-            added_count += len(batch) # Assuming success if no exception
-            logger.debug(f"Successfully added batch. Example IDs: {ids[:5]}...")
+            # Phase 2: upsert with the precomputed vectors, batches in flight concurrently.
+            batch_starts = list(range(0, total_docs, batch_size))
+            max_workers = min(config.VERTEX_UPSERT_CONCURRENCY, len(batch_starts))
+            logger.info(f"Upserting {len(batch_starts)} batches with up to {max_workers} in flight...")
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                future_to_size = {
+                    executor.submit(
+                        vector_store.add_texts_with_embeddings,
+                        texts=texts[i : i + batch_size],
+                        embeddings=vectors[i : i + batch_size],
+                        metadatas=metadatas[i : i + batch_size],
+                    ): len(texts[i : i + batch_size])
+                    for i in batch_starts
+                }
+                try:
+                    for future in as_completed(future_to_size):
+                        ids = future.result()
+                        added_count += future_to_size[future] # Assuming success if no exception
+                        logger.debug(f"Successfully upserted batch of {future_to_size[future]}. Example IDs: {ids[:5]}...")
+                except Exception:
+                    # First failure wins: stop submitting work that hasn't started yet,
+                    # then re-raise for the typed handlers below.
+                    for future in future_to_size:
+                        future.cancel()
+                    raise
+        else:
+            batch_starts = list(range(0, total_docs, batch_size))
+            max_workers = min(config.VERTEX_UPSERT_CONCURRENCY, len(batch_starts))
+            logger.info(f"Dispatching {len(batch_starts)} batches with up to {max_workers} in flight...")
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # add_texts handles embedding and GCS staging internally and
+                # returns the document IDs assigned by the vector store.
+                future_to_size = {
+                    executor.submit(
+                        vector_store.add_texts,
+                        texts=texts[i : i + batch_size],
+                        metadatas=metadatas[i : i + batch_size],
+                    ): len(texts[i : i + batch_size])
+                    for i in batch_starts
+                }
+                try:
+                    for future in as_completed(future_to_size):
+                        ids = future.result()
+                        added_count += future_to_size[future] # Assuming success if no exception
+                        logger.debug(f"Successfully added batch of {future_to_size[future]}. Example IDs: {ids[:5]}...")
+                except Exception:
+                    for future in future_to_size:
+                        future.cancel()
+                    raise
 
         logger.info(f"Successfully initiated adding {added_count}/{total_docs} documents to the vector store index.")
         logger.info("Note: Index update on Vertex AI may take some time to complete after this operation returns.")
 
+        if cache_conn is not None:
+            # Record the upserted chunks so future runs can skip them.
+            try:
+                cache_conn.executemany("INSERT OR IGNORE INTO upserted (key) VALUES (?)", [(key,) for key in cache_keys])
+                cache_conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to record upserted chunks in cache: {e}")
+
     except FailedPrecondition as e:
          logger.exception(f"FailedPrecondition error while adding documents (often indicates index/endpoint not ready or issues with staging bucket): {e}")
          raise RuntimeError("Failed to add documents due to precondition failure. Check index status, endpoint deployment, and GCS staging bucket permissions/existence.") from e
@@ -57,19 +302,37 @@ def add_documents_to_vector_store(vector_store: VertexAIVectorSearch, documents:
     except Exception as e:
         logger.exception(f"Unexpected error while adding documents. Processed {added_count} documents before error.")
         raise # Re-raise after logging
+    finally:
+        if cache_conn is not None:
+            cache_conn.close()
 
-def query_vector_store(vector_store: VertexAIVectorSearch, query: str, k: int = config.DEFAULT_SEARCH_K) -> List[Tuple[Document, float]]:
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=0.5),
+    retry=retry_if_exception_type(GoogleAPIError),
+    reraise=True,
+)
+def query_vector_store(vector_store: VectorSearchVectorStore, query: str, k: int = config.DEFAULT_SEARCH_K) -> List[Tuple[Document, float]]:
     """
     Performs a similarity search against the deployed Vertex AI Vector Search index.
 
+    Transient Google API errors are retried up to three times with
+    exponential backoff; persistent failures are raised so callers can
+    distinguish "no results" from "the query failed" instead of silently
+    receiving an empty list (and often retrying at full query cost).
+
     Args:
-        vector_store: The initialized VertexAIVectorSearch client instance.
+        vector_store: The initialized VectorSearchVectorStore client instance.
         query: The user query string.
         k: The number of nearest neighbors to retrieve. Defaults to config.DEFAULT_SEARCH_K.
 
     Returns:
-        A list of tuples, each containing a retrieved Document chunk and its similarity score.
-        Returns an empty list if no results are found or an error occurs (after logging).
+        A list of tuples, each containing a retrieved Document chunk and its
+        similarity score. Empty only when the index genuinely has no match.
+
+    Raises:
+        GoogleAPIError: If the search still fails after retries.
+        RuntimeError: For unexpected non-API failures.
     """
     if not config.VECTOR_SEARCH_DEPLOYED_INDEX_ID:
         logger.error("VECTOR_SEARCH_DEPLOYED_INDEX_ID is not set in config. Cannot perform query.")
@@ -81,13 +344,12 @@ def query_vector_store(vector_store: VertexAIVectorSearch, query: str, k: int =
 
     results: List[Tuple[Document, float]] = []
     try:
-        # similarity_search_with_score embeds the query using the store's embedding function
-        # and queries the specified deployed index.
+        # similarity_search_with_score embeds the query using the store's
+        # embedding function; the store resolves the deployed index from its
+        # endpoint configuration (the method takes no deployed_index_id).
         results = vector_store.similarity_search_with_score(
             query=query,
             k=k,
-            # *** CRITICAL: Specify the Deployed Index ID for querying ***
-            deployed_index_id=config.VECTOR_SEARCH_DEPLOYED_INDEX_ID,
             # Optional: Add filtering based on metadata stored during indexing
             # filter={"namespace": "your_rag_namespace", "source_year": 2023}
         )
@@ -95,14 +357,97 @@ def query_vector_store(vector_store: VertexAIVectorSearch, query: str, k: int =
         if results:
             logger.debug(f"Top result score: {results[0][1]:.4f}, Source: {results[0][0].metadata.get('source', 'N/A')}")
 
-    except GoogleAPIError as e:
-        logger.exception(f"Vertex AI API error during similarity search on deployed index {config.VECTOR_SEARCH_DEPLOYED_INDEX_ID}. Error: {e}")
-        # Decide whether to raise or return empty list. Returning empty might be safer for user experience.
-        # raise RuntimeError(f"Query failed due to API error: {e}") from e
-        print(f"\n[Error] Query failed due to API error: {e}\n", file=sys.stderr) # Also print for CLI visibility
+    except GoogleAPIError:
+        logger.exception(f"Vertex AI API error during similarity search on deployed index {config.VECTOR_SEARCH_DEPLOYED_INDEX_ID}.")
+        raise # The retry decorator handles transient failures; persistent ones propagate.
     except Exception as e:
-        logger.exception(f"Unexpected error during similarity search.")
-        # raise RuntimeError(f"Query failed unexpectedly: {e}") from e
-        print(f"\n[Error] Query failed unexpectedly: {e}\n", file=sys.stderr)
+        logger.exception("Unexpected error during similarity search.")
+        raise RuntimeError(f"Query failed unexpectedly: {e}") from e
+
+    return results
 
-    return results # Return empty list on error after logging
\ No newline at end of file
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=0.5),
+    retry=retry_if_exception_type(GoogleAPIError),
+    reraise=True,
+)
+def query_vector_store_batch(
+    vector_store: VectorSearchVectorStore, queries: List[str], k: int = config.DEFAULT_SEARCH_K
+) -> List[List[Tuple[Document, float]]]:
+    """
+    Performs similarity searches for several queries in one go.
+
+    Calling query_vector_store in a loop pays one embed_query round-trip
+    plus one search round-trip per query, strictly in sequence. This
+    variant embeds all queries through a single embed_documents call and
+    then dispatches the k-NN searches concurrently with the precomputed
+    vectors. If the store doesn't expose its embeddings client or a
+    search-by-vector entry point, the per-query searches still run
+    concurrently (each embedding its own query). Single-query callers
+    should keep using query_vector_store.
+
+    Args:
+        vector_store: The initialized VectorSearchVectorStore client instance.
+        queries: The user query strings.
+        k: The number of nearest neighbors to retrieve per query.
+           Defaults to config.DEFAULT_SEARCH_K.
+
+    Returns:
+        One result list per query, in query order; each is a list of
+        (Document, score) tuples as returned by query_vector_store.
+
+    Raises:
+        GoogleAPIError: If embedding or search still fails after retries.
+        RuntimeError: For unexpected non-API failures.
+    """
+    if not queries:
+        return []
+    if not config.VECTOR_SEARCH_DEPLOYED_INDEX_ID:
+        logger.error("VECTOR_SEARCH_DEPLOYED_INDEX_ID is not set in config. Cannot perform query.")
+        raise ValueError("Querying requires VECTOR_SEARCH_DEPLOYED_INDEX_ID to be configured.")
+
+    logger.info(f"Performing batched similarity search for {len(queries)} queries (k={k}).")
+    logger.info(f"Targeting deployed index ID: {config.VECTOR_SEARCH_DEPLOYED_INDEX_ID} on endpoint {config.VECTOR_SEARCH_INDEX_ENDPOINT_ID}")
+
+    embeddings_client = getattr(vector_store, "embeddings", None) or getattr(vector_store, "embedding", None)
+    search_by_vector = None
+    for method_name in ("similarity_search_by_vector_with_score", "similarity_search_by_vector_with_relevance_scores"):
+        if hasattr(vector_store, method_name):
+            search_by_vector = getattr(vector_store, method_name)
+            break
+
+    max_workers = min(len(queries), 16)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            if embeddings_client is not None and search_by_vector is not None:
+                # One embedding RPC for all queries, then concurrent k-NN searches.
+                # The by-vector methods take no deployed_index_id: the store
+                # resolves the deployed index from its endpoint configuration.
+                vectors = embeddings_client.embed_documents(queries)
+                futures = [executor.submit(search_by_vector, vector, k=k) for vector in vectors]
+            else:
+                logger.warning("Vector store does not support search by precomputed vector; embedding each query individually.")
+                # Like the by-vector path, similarity_search_with_score takes
+                # no deployed_index_id; the store resolves it from the endpoint.
+                futures = [
+                    executor.submit(vector_store.similarity_search_with_score, query=query, k=k)
+                    for query in queries
+                ]
+            try:
+                # Collect in submission order so results line up with queries.
+                all_results = [future.result() for future in futures]
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        logger.info(f"Batched search complete: {sum(len(r) for r in all_results)} chunks across {len(queries)} queries.")
+        return all_results
+
+    except GoogleAPIError:
+        logger.exception(f"Vertex AI API error during batched similarity search on deployed index {config.VECTOR_SEARCH_DEPLOYED_INDEX_ID}.")
+        raise # The retry decorator handles transient failures; persistent ones propagate.
+    except Exception as e:
+        logger.exception("Unexpected error during batched similarity search.")
+        raise RuntimeError(f"Batched query failed unexpectedly: {e}") from e
\ No newline at end of file